@@ -1,6 +1,10 @@
-import json
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 from threading import Lock
+from time import monotonic
 from inverterd import (
     Format,
     Client as InverterClient,
@@ -9,12 +13,22 @@ from inverterd import (
 
 _lock = Lock()
 
+# how long (in seconds) responses of read-only commands may be reused
+# cached responses are shared between callers and must not be modified
+_cache_ttl = {
+    'get-status': 1,
+    'get-errors': 5,
+    'get-rated': 60,
+    'get-day-generated': 60,
+}
+
 
 class InverterClientWrapper:
     def __init__(self):
         self._inverter = None
         self._host = None
         self._port = None
+        self._cache = {}
 
     def init(self, host: str, port: int):
         self._host = host
@@ -27,12 +41,21 @@ class InverterClientWrapper:
 
     def exec(self, command: str, arguments: tuple = (), format=Format.JSON):
         with _lock:
+            # the cache is checked under the lock, so concurrent callers
+            # asking for the same thing wait for the first request to
+            # complete and then get its result
+            ttl = _cache_ttl.get(command)
+            key = (command, arguments, format)
+            if ttl is not None and key in self._cache:
+                ts, response = self._cache[key]
+                if monotonic() - ts < ttl:
+                    return response
+
             try:
                 self._inverter.format(format)
                 response = self._inverter.exec(command, arguments)
                 if format == Format.JSON:
-                    response = json.loads(response)
-                return response
+                    response = json_loads(response)
             except InverterError as e:
                 raise e
             except Exception as e:
@@ -43,5 +66,13 @@ class InverterClientWrapper:
                     pass
                 raise e
 
+            if ttl is not None:
+                self._cache[key] = (monotonic(), response)
+            elif not command.startswith('get-'):
+                # settings might have changed
+                self._cache.clear()
+
+            return response
+
 
 wrapper_instance = InverterClientWrapper()
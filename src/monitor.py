@@ -1,8 +1,7 @@
 import logging
 
 from enum import Enum, auto
-from time import sleep
-from threading import Thread
+from threading import Thread, Event
 from typing import Union, List, Tuple, Callable, Optional
 from inverter_wrapper import wrapper_instance as inverter
 from inverterd import InverterError
@@ -40,14 +39,17 @@ class BatteryState(Enum):
     CRITICAL = auto()
 
 
+_pd_map = {
+    'Discharge': BatteryPowerDirection.DISCHARGING,
+    'Charge': BatteryPowerDirection.CHARGING,
+    'Do nothing': BatteryPowerDirection.DO_NOTHING,
+}
+
+
 def _pd_from_string(pd: str) -> BatteryPowerDirection:
-    if pd == 'Discharge':
-        return BatteryPowerDirection.DISCHARGING
-    elif pd == 'Charge':
-        return BatteryPowerDirection.CHARGING
-    elif pd == 'Do nothing':
-        return BatteryPowerDirection.DO_NOTHING
-    else:
+    try:
+        return _pd_map[pd]
+    except KeyError:
         raise ValueError(f'invalid power direction: {pd}')
 
 
@@ -55,15 +57,18 @@ class InverterMonitor(Thread):
     max_ac_current: Optional[int]
     min_ac_current: Optional[int]
     charging_thresholds: Optional[tuple[float, float]]
-    allowed_currents: list[int]
+    allowed_currents: tuple[int, ...]
+    allowed_currents_index: dict[int, int]
     battery_under_voltage: Optional[float]
     charging_event_handler: Optional[Callable]
     battery_event_handler: Optional[Callable]
     error_handler: Optional[Callable]
 
-    currents: list[int]
+    currents: tuple[int, ...]
+    current_cursor: int
     active_current: Optional[int]
     interrupted: bool
+    wake_event: Event
     battery_state: BatteryState
     charging_state: ChargingState
     mostly_charged: bool
@@ -75,7 +80,8 @@ class InverterMonitor(Thread):
         self.max_ac_current = None
         self.min_ac_current = None
         self.charging_thresholds = None
-        self.allowed_currents = []
+        self.allowed_currents = ()
+        self.allowed_currents_index = {}
         self.battery_under_voltage = None
 
         # event handlers
@@ -84,7 +90,8 @@ class InverterMonitor(Thread):
         self.error_handler = None
 
         # variables related to active program
-        self.currents = []
+        self.currents = ()
+        self.current_cursor = -1
         self.active_current = None
         self.battery_state = BatteryState.NORMAL
         self.charging_state = ChargingState.NOT_CHARGING
@@ -92,14 +99,15 @@ class InverterMonitor(Thread):
 
         # other stuff
         self.interrupted = False
+        self.wake_event = Event()
 
         self.set_ac_current_range(ac_current_range)
 
     def run(self):
-        self.allowed_currents = list(inverter.exec('get-allowed-ac-charging-currents')['data'])
-        self.allowed_currents.sort()
+        self.allowed_currents = tuple(sorted(inverter.exec('get-allowed-ac-charging-currents')['data']))
+        self.allowed_currents_index = {current: i for i, current in enumerate(self.allowed_currents)}
 
-        if self.max_ac_current not in self.allowed_currents or self.min_ac_current not in self.allowed_currents:
+        if self.max_ac_current not in self.allowed_currents_index or self.min_ac_current not in self.allowed_currents_index:
             raise RuntimeError('invalid AC currents range')
 
         # read config
@@ -114,7 +122,7 @@ class InverterMonitor(Thread):
             try:
                 response = inverter.exec('get-status')
                 if response['result'] != 'ok':
-                    _logger.error('get-status failed:', response)
+                    _logger.error('get-status failed: %s', response)
                 else:
                     gs = response['data']
 
@@ -124,7 +132,7 @@ class InverterMonitor(Thread):
                     load_watts = int(gs['ac_output_active_power']['value'])
                     pd = _pd_from_string(gs['battery_power_direction'])
 
-                    _logger.debug(f'got status: ac={ac}, solar={solar}, v={v}, pd={pd}')
+                    _logger.debug('got status: ac=%s, solar=%s, v=%s, pd=%s', ac, solar, v, pd)
 
                     self.ac_charging_program(ac, solar, v, pd)
 
@@ -139,7 +147,9 @@ class InverterMonitor(Thread):
             except InverterError as e:
                 _logger.exception(e)
 
-            sleep(2)
+            # wait for the next poll, unless somebody asks to poll right away
+            self.wake_event.wait(2)
+            self.wake_event.clear()
 
     def ac_charging_program(self, ac: bool, solar: bool, v: float, pd: BatteryPowerDirection):
         if self.charging_state == ChargingState.NOT_CHARGING:
@@ -205,11 +215,12 @@ class InverterMonitor(Thread):
 
         # set the current even if charging has not been started yet
         # this path must be entered only once per charging cycle,
-        # and self.currents array is used to guarantee that
+        # and self.currents tuple is used to guarantee that
         if not self.currents:
-            index_min = self.allowed_currents.index(self.min_ac_current)
-            index_max = self.allowed_currents.index(self.max_ac_current)
+            index_min = self.allowed_currents_index[self.min_ac_current]
+            index_max = self.allowed_currents_index[self.max_ac_current]
             self.currents = self.allowed_currents[index_min:index_max + 1]
+            self.current_cursor = len(self.currents) - 1
             self.ac_charging_next_current()
 
     def ac_charging_stop(self, reason: ChargingState):
@@ -222,24 +233,26 @@ class InverterMonitor(Thread):
         else:
             raise ValueError(f'ac_charging_stop: unexpected reason {reason}')
 
-        _logger.info(f'charging is finished, entering {reason} state')
+        _logger.info('charging is finished, entering %s state', reason)
         self.charging_event_handler(event)
 
         if self.currents:
-            self.currents = []
+            self.currents = ()
+            self.current_cursor = -1
             self.mostly_charged = False
             self.active_current = None
 
     def ac_charging_next_current(self):
-        try:
-            current = self.currents.pop()
-            _logger.debug(f'ready to change charging current to {current}A')
-            self.active_current = current
-        except IndexError:
+        if self.current_cursor < 0:
             _logger.debug('was going to change charging current, but no currents left; finishing charging program')
             self.ac_charging_stop(ChargingState.AC_DONE)
             return
 
+        current = self.currents[self.current_cursor]
+        self.current_cursor -= 1
+        _logger.debug('ready to change charging current to %dA', current)
+        self.active_current = current
+
         if current <= 10 and not self.mostly_charged:
             self.mostly_charged = True
             self.charging_event_handler(ChargingEvent.AC_MOSTLY_CHARGED)
@@ -247,11 +260,11 @@ class InverterMonitor(Thread):
         try:
             response = inverter.exec('set-max-ac-charging-current', (0, current))
             if response['result'] != 'ok':
-                _logger.error(f'failed to change AC charging current to {current} A')
+                _logger.error('failed to change AC charging current to %d A', current)
                 raise InverterError('set-max-ac-charging-current: inverterd reported error')
             else:
                 self.charging_event_handler(ChargingEvent.AC_CURRENT_CHANGED, current=current)
-                _logger.info(f'changed AC charging current to {current} A')
+                _logger.info('changed AC charging current to %d A', current)
         except InverterError as e:
             self.error_handler(f'failed to set charging current to {current} A (caught InverterError)')
             _logger.exception(e)
@@ -280,14 +293,18 @@ class InverterMonitor(Thread):
     def set_ac_current_range(self, ac_current_range: Union[List, Tuple] = ()) -> None:
         self.min_ac_current = ac_current_range[0]
         self.max_ac_current = ac_current_range[1]
-        _logger.debug(f'setting AC current range to {ac_current_range[0]} A .. {ac_current_range[1]} A')
+        _logger.debug('setting AC current range to %s A .. %s A', ac_current_range[0], ac_current_range[1])
 
     def set_battery_under_voltage(self, v: float):
         self.battery_under_voltage = v
-        _logger.debug(f'setting battery under voltage: {v}')
+        _logger.debug('setting battery under voltage: %s', v)
 
     def set_battery_ac_charging_thresholds(self, cv: float, dv: float):
         self.charging_thresholds = (cv, dv)
 
+    def poke(self):
+        self.wake_event.set()
+
     def stop(self):
         self.interrupted = True
+        self.poke()